@@ -4,23 +4,551 @@ Custom PDF MCP Server using FastMCP
 支持读取PDF文件并提取文本内容
 """
 
+import atexit
+import functools
+import gc
 import os
+import stat
 import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, fields
+from itertools import islice, repeat
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Iterator, Sequence, Tuple, Union
 import PyPDF2
 import pdfplumber
+import pypdfium2 as pdfium
 from fastmcp import FastMCP
+from pdfminer.pdfpage import PDFPage
+
+try:
+    # PyMuPDF为可选依赖（AGPL许可），安装后作为默认的文本提取引擎。
+    # 使用pymupdf模块名导入，旧的fitz模块名在新版本中导入时会打印弃用警告
+    import pymupdf
+except ImportError:
+    pymupdf = None
+else:
+    # stdout是MCP stdio传输的JSON-RPC通道，PyMuPDF默认打印到stdout的提示和警告
+    # 会破坏协议帧：消息改走logging，并关闭find_tables直接print的布局分析推荐
+    pymupdf.set_messages(pylogging=True)
+    if hasattr(pymupdf, "no_recommend_layout"):
+        pymupdf.no_recommend_layout()
 
 # 创建MCP应用实例
 mcp = FastMCP("PDF Reader MCP")
 
+# 每处理多少页执行一次垃圾回收
+GC_INTERVAL_PAGES = 50
+
+# read_pdf_text单次调用默认最多提取的页数和字符数
+DEFAULT_MAX_PAGES = 500
+DEFAULT_MAX_CHARS = 2_000_000
+
+# pdfplumber路径下，待处理页数达到该值时使用进程池并行提取
+PARALLEL_MIN_PAGES = 4
+
+# 递归查找PDF时跳过的目录（隐藏目录也会被跳过）
+SKIP_DIRS = {"node_modules", "__pycache__"}
+
+# 设置环境变量PDF_MCP_PARALLEL_STAT=1时，列出PDF使用线程池批量stat。
+# 本地文件系统上stat通常命中缓存，线程切换开销反而更大，因此默认逐个stat；
+# 只有在stat延迟较高的网络文件系统上才建议开启
+PARALLEL_STAT = os.environ.get("PDF_MCP_PARALLEL_STAT") == "1"
+
+# 开启批量stat时，待获取文件信息的条目数达到该值才使用线程池
+STAT_BATCH_MIN_FILES = 64
+
+# 批量stat使用的线程数
+STAT_WORKERS = 16
+
+# 并行遍历目录使用的线程数
+WALK_WORKERS = 8
+
+# 跨调用缓存的已解析PDF数量上限
+PDF_CACHE_SIZE = 8
+
+# 已打开的pdfplumber文档在空闲多少秒后关闭
+PDF_IDLE_TIMEOUT = 300
+
+# output_format为"resource"时最多保留的临时文本文件数量，超出后删除最早的文件
+RESOURCE_FILE_LIMIT = 16
+
+@dataclass
+class _OpenPdf:
+    """
+    已打开的pdfplumber文档及其使用状态
+    """
+    version: Tuple[int, int]
+    pdf: pdfplumber.PDF
+    # 正在使用该文档的调用数，大于0时不会被关闭
+    in_use: int = 0
+    timer: Optional[threading.Timer] = None
+    # 已从缓存中移除（文件被修改、被淘汰或缓存被清空），最后一个使用者归还后关闭
+    evicted: bool = False
+    # 页面树中的页面对象，首次使用时遍历一次后缓存
+    page_objs: Optional[List[PDFPage]] = None
+    
+    def load_page(self, page_idx: int) -> pdfplumber.page.Page:
+        """
+        只为要提取的页面构建pdfplumber页面对象
+        
+        pdf.pages会为文档中的每一页都构建Page对象；这里改为缓存轻量的PDFPage列表，
+        每次调用只构建请求的页面，处理后即可释放。initial_doctop取0只影响跨页的
+        doctop坐标，不影响单页文本和表格的提取结果
+        """
+        if self.page_objs is None:
+            self.page_objs = list(PDFPage.create_pages(self.pdf.doc))
+        return pdfplumber.page.Page(self.pdf, self.page_objs[page_idx], page_number=page_idx + 1)
+
+# 已打开的pdfplumber文档：路径 -> _OpenPdf，按最近使用顺序排列，最早的条目在最前面
+_open_pdfs: Dict[str, _OpenPdf] = {}
+_open_pdfs_lock = threading.Lock()
+
+def _pdf_cache_key(file_path: str, st: Optional[os.stat_result] = None) -> Tuple[str, int, int]:
+    """
+    生成PDF缓存键：(路径, 修改时间, 文件大小)，文件被修改后缓存自动失效
+    
+    Args:
+        file_path: PDF文件路径
+        st: 已获取的文件状态，传入时不再重复stat
+    """
+    if st is None:
+        st = os.stat(file_path)
+    return file_path, st.st_mtime_ns, st.st_size
+
+def _evict_open_pdf(open_pdf: _OpenPdf) -> bool:
+    """
+    将文档标记为已移出缓存（调用时需持有_open_pdfs_lock）
+    
+    Returns:
+        文档当前无人使用、可以立即关闭时返回True
+    """
+    open_pdf.evicted = True
+    if open_pdf.timer is not None:
+        open_pdf.timer.cancel()
+        open_pdf.timer = None
+    return open_pdf.in_use == 0
+
+@contextmanager
+def _checkout_pdf(path: str, st: Optional[os.stat_result] = None) -> Iterator[_OpenPdf]:
+    """
+    借出已打开的pdfplumber文档，未打开或文件已被修改时重新打开
+    
+    同一文件的多次调用（如先读1-10页再读11-20页）共用一个文档对象，无需重复解析xref。
+    借出期间文档不会被关闭；最后一个使用者归还后开始计时，
+    空闲超过PDF_IDLE_TIMEOUT秒后由定时器关闭
+    
+    Args:
+        path: PDF文件路径
+        st: 已获取的文件状态，传入时不再重复stat
+    """
+    _, mtime_ns, size = _pdf_cache_key(path, st)
+    version = (mtime_ns, size)
+    
+    with _open_pdfs_lock:
+        open_pdf = _take_cached_pdf(path, version)
+    
+    if open_pdf is None:
+        # 在锁外打开和解析文档，避免阻塞其他调用和空闲定时器线程；
+        # 打开失败时缓存保持原样，旧文档仍由缓存管理，不会泄漏
+        new_pdf = pdfplumber.open(path)
+        pdfs_to_close = []
+        try:
+            with _open_pdfs_lock:
+                # 打开期间其他调用可能已缓存了同一版本的文档，此时使用已缓存的文档
+                open_pdf = _take_cached_pdf(path, version)
+                if open_pdf is not None:
+                    pdfs_to_close.append(new_pdf)
+                else:
+                    stale = _open_pdfs.pop(path, None)
+                    # 文件已被修改，旧文档归还后关闭
+                    if stale is not None and _evict_open_pdf(stale):
+                        pdfs_to_close.append(stale.pdf)
+                    
+                    # 超出数量上限时淘汰最久未使用的文档
+                    while len(_open_pdfs) >= PDF_CACHE_SIZE:
+                        oldest = _open_pdfs.pop(next(iter(_open_pdfs)))
+                        if _evict_open_pdf(oldest):
+                            pdfs_to_close.append(oldest.pdf)
+                    
+                    open_pdf = _OpenPdf(version, new_pdf, in_use=1)
+                    _open_pdfs[path] = open_pdf
+        finally:
+            for pdf in pdfs_to_close:
+                pdf.close()
+    
+    try:
+        yield open_pdf
+    finally:
+        _release_pdf(path, open_pdf)
+
+def _take_cached_pdf(path: str, version: Tuple[int, int]) -> Optional[_OpenPdf]:
+    """
+    借出缓存中版本一致的文档（调用时需持有_open_pdfs_lock）
+    
+    Returns:
+        借出的文档；未缓存或文件已被修改时返回None
+    """
+    open_pdf = _open_pdfs.get(path)
+    if open_pdf is None or open_pdf.version != version:
+        return None
+    
+    # 移到末尾，标记为最近使用
+    del _open_pdfs[path]
+    _open_pdfs[path] = open_pdf
+    open_pdf.in_use += 1
+    if open_pdf.timer is not None:
+        open_pdf.timer.cancel()
+        open_pdf.timer = None
+    return open_pdf
+
+def _release_pdf(path: str, open_pdf: _OpenPdf) -> None:
+    """
+    归还借出的文档：仍在缓存中则开始空闲计时，已移出缓存则关闭
+    """
+    with _open_pdfs_lock:
+        open_pdf.in_use -= 1
+        if open_pdf.in_use > 0:
+            return
+        
+        if not open_pdf.evicted:
+            open_pdf.timer = threading.Timer(PDF_IDLE_TIMEOUT, _close_idle_pdf, args=(path, open_pdf))
+            open_pdf.timer.daemon = True
+            open_pdf.timer.start()
+            return
+    
+    open_pdf.pdf.close()
+
+def _close_idle_pdf(path: str, open_pdf: _OpenPdf) -> None:
+    """
+    关闭空闲超时的文档（由定时器线程调用）
+    """
+    with _open_pdfs_lock:
+        # 文档在定时器触发前已被重新借出或移出缓存
+        if _open_pdfs.get(path) is not open_pdf or open_pdf.in_use > 0:
+            return
+        del _open_pdfs[path]
+        _evict_open_pdf(open_pdf)
+    
+    open_pdf.pdf.close()
+
+# output_format为"resource"时写出的临时文本文件，按创建顺序排列
+_resource_files: List[str] = []
+_resource_files_lock = threading.Lock()
+
+def _write_resource_file(text: str) -> str:
+    """
+    将文本写入临时文件并登记，超出RESOURCE_FILE_LIMIT时删除最早的文件
+    
+    Args:
+        text: 要写入的文本
+    
+    Returns:
+        临时文件路径
+    """
+    with tempfile.NamedTemporaryFile(
+        mode="w", encoding="utf-8", prefix="pdf_mcp_", suffix=".txt", delete=False
+    ) as text_file:
+        text_file.write(text)
+    
+    with _resource_files_lock:
+        _resource_files.append(text_file.name)
+        stale_files = _resource_files[:-RESOURCE_FILE_LIMIT]
+        del _resource_files[:-RESOURCE_FILE_LIMIT]
+    
+    _remove_files(stale_files)
+    return text_file.name
+
+def _remove_files(paths: List[str]) -> None:
+    """
+    删除文件，已不存在或无法删除的文件直接跳过
+    """
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _pdf_cache_clear() -> None:
+    """
+    清空PDF缓存，关闭缓存中的文档（正在使用的文档在归还后关闭）并删除resource临时文件
+    """
+    _read_pdf_info.cache_clear()
+    
+    with _resource_files_lock:
+        resource_files = _resource_files[:]
+        _resource_files.clear()
+    _remove_files(resource_files)
+    
+    pdfs_to_close = []
+    with _open_pdfs_lock:
+        for open_pdf in _open_pdfs.values():
+            if _evict_open_pdf(open_pdf):
+                pdfs_to_close.append(open_pdf.pdf)
+        _open_pdfs.clear()
+    
+    for pdf in pdfs_to_close:
+        pdf.close()
+
+atexit.register(_pdf_cache_clear)
+
+def _validate_abs_path(
+    path: str,
+    kind: str = 'file'
+) -> Tuple[Optional[os.stat_result], Optional[Dict[str, Any]]]:
+    """
+    校验工具输入的路径：必须是绝对路径且存在，kind为'directory'时还必须是目录
+    
+    只调用一次os.stat完成存在性和类型检查，权限错误交由调用方统一处理
+    
+    Returns:
+        (文件状态, 错误字典)，校验失败时文件状态为None
+    """
+    label = "Directory" if kind == 'directory' else "File"
+    
+    if not os.path.isabs(path):
+        return None, {
+            "success": False,
+            "error": f"{label} path must be absolute path, got: {path}"
+        }
+    
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None, {
+            "success": False,
+            "error": f"{label} not found: {path}"
+        }
+    
+    if kind == 'directory' and not stat.S_ISDIR(st.st_mode):
+        return None, {
+            "success": False,
+            "error": f"Path is not a directory: {path}"
+        }
+    
+    return st, None
+
+def _is_pdf_name(name: str) -> bool:
+    """
+    判断文件名是否为.pdf扩展名（忽略大小写，只转换末尾4个字符）
+    """
+    return name[-4:].lower() == '.pdf'
+
+def _release_page(page: pdfplumber.page.Page) -> None:
+    """
+    释放pdfplumber页面上缓存的解析结果
+    """
+    page.flush_cache()
+    cache_clear = getattr(page.get_textmap, "cache_clear", None)
+    if cache_clear is not None:
+        cache_clear()
+
+def _extract_plumber_page(page: pdfplumber.page.Page, extract_tables: bool) -> Dict[str, Any]:
+    """
+    从pdfplumber页面中提取文本（及表格），提取后释放该页缓存
+    """
+    page_text = page.extract_text() or ""
+    
+    page_info = {
+        "page_number": page.page_number,
+        "text": page_text
+    }
+    
+    # 如果需要提取表格
+    if extract_tables:
+        try:
+            tables = page.extract_tables()
+            page_info["tables"] = tables if tables else []
+        except Exception as e:
+            page_info["tables"] = []
+            page_info["table_extraction_error"] = str(e)
+    
+    # 返回的page_info只保存纯文本/表格数据，不持有pdfplumber对象，
+    # 因此可以立即释放该页缓存的字符、线条等对象，使内存占用与页数无关
+    _release_page(page)
+    
+    return page_info
+
+def _extract_page(
+    file_path: str,
+    st: os.stat_result,
+    page_idx: int,
+    extract_tables: bool
+) -> Dict[str, Any]:
+    """
+    提取一页（在进程池的子进程中执行，因此必须是模块级函数）
+    
+    子进程同样通过_checkout_pdf缓存已打开的文档，同一文件的后续页面和后续调用无需重新解析
+    """
+    with _checkout_pdf(file_path, st) as open_pdf:
+        return _extract_plumber_page(open_pdf.load_page(page_idx), extract_tables)
+
+def _init_plumber_worker() -> None:
+    """
+    进程池子进程的初始化函数
+    
+    以fork方式创建的子进程会继承父进程的文档缓存，其中的文件对象与父进程共享读写位置，
+    锁也可能正被父进程的其他线程持有，因此子进程丢弃继承的状态，重新建立自己的缓存
+    """
+    global _open_pdfs, _open_pdfs_lock, _resource_files, _resource_files_lock
+    _open_pdfs = {}
+    _open_pdfs_lock = threading.Lock()
+    _resource_files = []
+    _resource_files_lock = threading.Lock()
+
+# pdfplumber并行提取使用的进程池，首次需要时创建，跨调用复用
+_plumber_pool: Optional[ProcessPoolExecutor] = None
+_plumber_pool_lock = threading.Lock()
+
+def _get_plumber_pool() -> ProcessPoolExecutor:
+    """
+    获取共享的进程池，不存在时创建
+    
+    子进程只在创建时导入一次模块（spawn方式下这一步耗时明显），之后各自缓存已打开的文档
+    """
+    global _plumber_pool
+    with _plumber_pool_lock:
+        if _plumber_pool is None:
+            _plumber_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                initializer=_init_plumber_worker
+            )
+        return _plumber_pool
+
+def _discard_plumber_pool(executor: ProcessPoolExecutor) -> None:
+    """
+    丢弃已损坏的进程池（如子进程异常退出），下次调用时重新创建
+    """
+    global _plumber_pool
+    with _plumber_pool_lock:
+        if _plumber_pool is executor:
+            _plumber_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _shutdown_plumber_pool() -> None:
+    """
+    进程退出时关闭共享的进程池
+    """
+    global _plumber_pool
+    with _plumber_pool_lock:
+        executor, _plumber_pool = _plumber_pool, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+
+atexit.register(_shutdown_plumber_pool)
+
+def _count_pages(file_path: str) -> int:
+    """
+    快速获取PDF总页数（只读取页面树，不解析页面内容）
+    """
+    if pymupdf is not None:
+        with pymupdf.open(file_path, filetype="pdf") as doc:
+            return doc.page_count
+    
+    with open(file_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+def _iter_pages_pymupdf(
+    doc: "pymupdf.Document",
+    pages_to_process: Sequence[int],
+    extract_tables: bool
+) -> Iterator[Dict[str, Any]]:
+    """
+    使用PyMuPDF逐页提取文本（及表格）
+    """
+    for page_idx in pages_to_process:
+        page = doc.load_page(page_idx)
+        page_text = page.get_text("text")
+        
+        page_info = {
+            "page_number": page_idx + 1,
+            "text": page_text
+        }
+        
+        # 如果需要提取表格（PyMuPDF >= 1.23）
+        if extract_tables:
+            try:
+                tables = [table.extract() for table in page.find_tables().tables]
+                page_info["tables"] = tables
+            except Exception as e:
+                page_info["tables"] = []
+                page_info["table_extraction_error"] = str(e)
+        
+        yield page_info
+
+def _iter_pages_pdfium(doc: pdfium.PdfDocument, pages_to_process: Sequence[int]) -> Iterator[Dict[str, Any]]:
+    """
+    使用pypdfium2（PDFium的C++文本提取）逐页提取文本，仅用于不需要表格的场景
+    """
+    for page_idx in pages_to_process:
+        page = doc[page_idx]
+        textpage = page.get_textpage()
+        try:
+            # PDFium以\r\n换行，统一为\n与其他引擎保持一致
+            page_text = textpage.get_text_bounded().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+        
+        yield {
+            "page_number": page_idx + 1,
+            "text": page_text
+        }
+
+def _iter_pages_plumber(
+    file_path: str,
+    st: os.stat_result,
+    pages_to_process: Sequence[int],
+    extract_tables: bool
+) -> Iterator[Dict[str, Any]]:
+    """
+    使用pdfplumber逐页提取文本（及表格），页数较多时使用进程池并行提取
+    """
+    max_workers = min(os.cpu_count() or 1, len(pages_to_process))
+    
+    if len(pages_to_process) >= PARALLEL_MIN_PAGES and max_workers > 1:
+        # pdfminer是纯Python解析，受GIL限制无法用线程加速，因此按页分发到进程池；
+        # executor.map按输入顺序返回结果，页面顺序保持不变。
+        # 调用方提前停止迭代（如达到max_chars）时，map的结果迭代器被关闭并取消尚未开始的页面
+        executor = _get_plumber_pool()
+        try:
+            yield from executor.map(
+                _extract_page,
+                repeat(file_path),
+                repeat(st),
+                pages_to_process,
+                repeat(extract_tables),
+                chunksize=4
+            )
+        except BrokenProcessPool:
+            _discard_plumber_pool(executor)
+            raise
+        return
+    
+    # 页数较少时进程启动开销得不偿失，直接在当前进程处理；
+    # 文档对象跨调用复用，重复读取同一文件时无需重新解析
+    # 借出期间（包括调用方暂停迭代时）文档不会被空闲定时器或淘汰关闭
+    with _checkout_pdf(file_path, st) as open_pdf:
+        for processed, page_idx in enumerate(pages_to_process):
+            yield _extract_plumber_page(open_pdf.load_page(page_idx), extract_tables)
+            if (processed + 1) % GC_INTERVAL_PAGES == 0:
+                gc.collect()
+
 @mcp.tool()
 def read_pdf_text(
     file_path: str,
     page_numbers: Optional[List[int]] = None,
-    extract_tables: bool = False
-) -> Dict[str, Any]:
+    extract_tables: bool = False,
+    include_full_text: bool = True,
+    start_page: int = 1,
+    max_pages: Optional[int] = DEFAULT_MAX_PAGES,
+    max_chars: Optional[int] = DEFAULT_MAX_CHARS,
+    output_format: Literal["json", "text", "resource"] = "json"
+) -> Union[Dict[str, Any], str]:
     """
     读取PDF文件并提取文本内容
     
@@ -28,25 +556,42 @@ def read_pdf_text(
         file_path: PDF文件绝对路径（必须是绝对路径）
         page_numbers: 要提取的页面号列表，如果为None则提取所有页面
         extract_tables: 是否提取表格数据
+        include_full_text: 是否返回拼接后的全文（full_text），只需要逐页文本时可关闭以减少内存和响应体积
+        start_page: 未指定page_numbers时，从第几页开始提取
+        max_pages: 单次最多提取的页数，默认500页，为None则不限制
+        max_chars: 单次最多提取的字符数，达到后停止提取后续页面，默认200万字符，为None则不限制
+        output_format: 返回格式，"json"返回包含逐页内容的字典；"text"只返回全文纯文本，
+            未提取完时在末尾附加截断提示；"resource"将全文写入临时文件，只返回文件URI
+            （resource_uri）和提取信息，临时文件只保留最近RESOURCE_FILE_LIMIT个，
+            清空缓存或进程退出时删除
     
     Returns:
-        包含文本内容、页面信息等的字典
+        包含文本内容、页面信息等的字典；因max_pages/max_chars未提取完时truncated为True，
+        未指定page_numbers时next_page为下一个待提取的页码（作为下次调用的start_page），
+        指定了page_numbers时remaining_page_numbers为尚未提取的页码（作为下次调用的page_numbers）。
+        output_format为"text"时返回全文字符串，未提取完时末尾附加以"[truncated:"开头的提示行
     """
     try:
-        # 验证输入必须是绝对路径
-        if not os.path.isabs(file_path):
+        if output_format not in ("json", "text", "resource"):
             return {
                 "success": False,
-                "error": f"File path must be absolute path, got: {file_path}"
+                "error": f"output_format must be 'json', 'text' or 'resource', got: {output_format}"
             }
         
-        if not os.path.exists(file_path):
+        if (start_page < 1 or (max_pages is not None and max_pages < 1)
+                or (max_chars is not None and max_chars < 1)):
             return {
                 "success": False,
-                "error": f"File not found: {file_path}"
+                "error": f"start_page, max_pages and max_chars must be positive, "
+                         f"got: start_page={start_page}, max_pages={max_pages}, max_chars={max_chars}"
             }
         
-        if not file_path.lower().endswith('.pdf'):
+        # 验证输入必须是绝对路径且文件存在
+        st, error = _validate_abs_path(file_path)
+        if error is not None:
+            return error
+        
+        if not _is_pdf_name(file_path):
             return {
                 "success": False,
                 "error": "File must be a PDF"
@@ -56,46 +601,107 @@ def read_pdf_text(
             "success": True,
             "file_path": file_path,
             "pages": [],
-            "total_pages": 0,
-            "full_text": ""
+            "total_pages": 0
         }
         
-        # 使用pdfplumber读取PDF（更好的文本提取能力）
-        with pdfplumber.open(file_path) as pdf:
-            result["total_pages"] = len(pdf.pages)
+        # 选择提取引擎：优先使用PyMuPDF（C引擎，解析速度远快于pdfminer）；未安装PyMuPDF时，
+        # 只需文本则使用pypdfium2，需要表格（或PyMuPDF版本不支持表格提取）时回退到pdfplumber
+        if pymupdf is not None and (not extract_tables or hasattr(pymupdf.Page, "find_tables")):
+            backend = "pymupdf"
+            doc = pymupdf.open(file_path, filetype="pdf")
+        elif not extract_tables:
+            backend = "pdfium"
+            doc = pdfium.PdfDocument(file_path)
+        else:
+            backend = "pdfplumber"
+            doc = None
+        
+        try:
+            if backend == "pymupdf":
+                total_pages = doc.page_count
+            elif backend == "pdfium":
+                total_pages = len(doc)
+            else:
+                # 先廉价地获取总页数，避免仅为统计页数而让pdfplumber构建所有页面
+                total_pages = _count_pages(file_path)
+            result["total_pages"] = total_pages
             
             # 确定要处理的页面
             if page_numbers is None:
-                pages_to_process = range(len(pdf.pages))
+                requested_pages = range(start_page - 1, total_pages)
             else:
-                pages_to_process = [p - 1 for p in page_numbers if 0 < p <= len(pdf.pages)]
+                requested_pages = [p - 1 for p in page_numbers if 0 < p <= total_pages]
+            
+            # 超出max_pages的页面留待下次调用
+            pages_to_process = requested_pages[:max_pages] if max_pages is not None else requested_pages
             
-            full_text_parts = []
+            if backend == "pymupdf":
+                page_iter = _iter_pages_pymupdf(doc, pages_to_process, extract_tables)
+            elif backend == "pdfium":
+                page_iter = _iter_pages_pdfium(doc, pages_to_process)
+            else:
+                page_iter = _iter_pages_plumber(file_path, st, pages_to_process, extract_tables)
             
-            for page_idx in pages_to_process:
-                page = pdf.pages[page_idx]
-                page_text = page.extract_text() or ""
-                
-                page_info = {
-                    "page_number": page_idx + 1,
-                    "text": page_text
-                }
-                
-                # 如果需要提取表格
-                if extract_tables:
-                    try:
-                        tables = page.extract_tables()
-                        page_info["tables"] = tables if tables else []
-                    except Exception as e:
-                        page_info["tables"] = []
-                        page_info["table_extraction_error"] = str(e)
-                
-                result["pages"].append(page_info)
-                full_text_parts.append(page_text)
+            char_count = 0
+            with closing(page_iter):
+                for page_info in page_iter:
+                    result["pages"].append(page_info)
+                    char_count += len(page_info["text"])
+                    
+                    # 文本量达到max_chars时停止，剩余页面留待下次调用
+                    if max_chars is not None and char_count >= max_chars:
+                        break
+        finally:
+            if doc is not None:
+                doc.close()
+        
+        # 未提取的页面：按start_page读取时返回下一页页码，按page_numbers读取时返回剩余页码列表
+        unprocessed_pages = requested_pages[len(result["pages"]):]
+        result["truncated"] = len(unprocessed_pages) > 0
+        result["next_page"] = None
+        result["remaining_page_numbers"] = None
+        if result["truncated"]:
+            if page_numbers is None:
+                result["next_page"] = unprocessed_pages[0] + 1
+            else:
+                result["remaining_page_numbers"] = [page_idx + 1 for page_idx in unprocessed_pages]
+        
+        if output_format == "json":
+            # 全文直接由各页文本拼接，不再额外维护一份文本列表
+            if include_full_text:
+                result["full_text"] = "\n\n".join(page_info["text"] for page_info in result["pages"])
             
-            result["full_text"] = "\n\n".join(full_text_parts)
+            return result
         
-        return result
+        full_text = "\n\n".join(page_info["text"] for page_info in result["pages"])
+        
+        if output_format == "text":
+            # 直接返回纯文本，避免整篇文本再经过一层JSON字典编码和转义；
+            # 纯文本没有truncated等字段，未提取完时在末尾注明如何继续读取
+            if result["truncated"]:
+                if result["next_page"] is not None:
+                    continue_with = f"start_page={result['next_page']}"
+                else:
+                    continue_with = f"page_numbers={result['remaining_page_numbers']}"
+                full_text += (
+                    f"\n\n[truncated: extracted {len(result['pages'])} pages, "
+                    f"continue with {continue_with}]"
+                )
+            return full_text
+        
+        # 将全文写入临时文件，只返回文件URI和提取信息，调用方可直接读取（或mmap）该文件
+        resource_path = _write_resource_file(full_text)
+        
+        return {
+            "success": True,
+            "file_path": file_path,
+            "total_pages": result["total_pages"],
+            "page_numbers": [page_info["page_number"] for page_info in result["pages"]],
+            "truncated": result["truncated"],
+            "next_page": result["next_page"],
+            "remaining_page_numbers": result["remaining_page_numbers"],
+            "resource_uri": Path(resource_path).as_uri()
+        }
         
     except PermissionError as e:
         return {
@@ -108,6 +714,61 @@ def read_pdf_text(
             "error": f"Error reading PDF: {str(e)}"
         }
 
+@functools.lru_cache(maxsize=PDF_CACHE_SIZE)
+def _read_pdf_info(file_path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """
+    读取PDF元数据（结果按缓存键缓存）
+    """
+    if pymupdf is not None:
+        # PyMuPDF只需读取trailer和文档目录即可得到页数和元数据，不遍历页面
+        with pymupdf.open(file_path, filetype="pdf") as doc:
+            metadata = doc.metadata or {}
+            
+            return {
+                "success": True,
+                "file_path": file_path,
+                "page_count": doc.page_count,
+                "metadata": {
+                    "title": metadata.get("title", ""),
+                    "author": metadata.get("author", ""),
+                    "subject": metadata.get("subject", ""),
+                    "creator": metadata.get("creator", ""),
+                    "producer": metadata.get("producer", ""),
+                    "creation_date": metadata.get("creationDate", ""),
+                    "modification_date": metadata.get("modDate", "")
+                },
+                "file_size": size
+            }
+    
+    # 未安装PyMuPDF时使用PyPDF2获取元数据
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        
+        info = {
+            "success": True,
+            "file_path": file_path,
+            "page_count": len(pdf_reader.pages),
+            "metadata": {}
+        }
+        
+        # 提取元数据
+        if pdf_reader.metadata:
+            metadata = pdf_reader.metadata
+            info["metadata"] = {
+                "title": metadata.get("/Title", ""),
+                "author": metadata.get("/Author", ""),
+                "subject": metadata.get("/Subject", ""),
+                "creator": metadata.get("/Creator", ""),
+                "producer": metadata.get("/Producer", ""),
+                "creation_date": str(metadata.get("/CreationDate", "")),
+                "modification_date": str(metadata.get("/ModDate", ""))
+            }
+        
+        # 文件大小
+        info["file_size"] = size
+        
+        return info
+
 @mcp.tool()
 def get_pdf_info(file_path: str) -> Dict[str, Any]:
     """
@@ -120,48 +781,14 @@ def get_pdf_info(file_path: str) -> Dict[str, Any]:
         包含PDF元数据信息的字典
     """
     try:
-        # 验证输入必须是绝对路径
-        if not os.path.isabs(file_path):
-            return {
-                "success": False,
-                "error": f"File path must be absolute path, got: {file_path}"
-            }
+        # 验证输入必须是绝对路径且文件存在
+        st, error = _validate_abs_path(file_path)
+        if error is not None:
+            return error
         
-        if not os.path.exists(file_path):
-            return {
-                "success": False,
-                "error": f"File not found: {file_path}"
-            }
+        # 元数据按(路径, 修改时间, 大小)缓存，重复查询同一文件时直接返回
+        return _read_pdf_info(*_pdf_cache_key(file_path, st))
         
-        # 使用PyPDF2获取元数据
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            info = {
-                "success": True,
-                "file_path": file_path,
-                "page_count": len(pdf_reader.pages),
-                "metadata": {}
-            }
-            
-            # 提取元数据
-            if pdf_reader.metadata:
-                metadata = pdf_reader.metadata
-                info["metadata"] = {
-                    "title": metadata.get("/Title", ""),
-                    "author": metadata.get("/Author", ""),
-                    "subject": metadata.get("/Subject", ""),
-                    "creator": metadata.get("/Creator", ""),
-                    "producer": metadata.get("/Producer", ""),
-                    "creation_date": str(metadata.get("/CreationDate", "")),
-                    "modification_date": str(metadata.get("/ModDate", ""))
-                }
-            
-            # 文件大小
-            info["file_size"] = os.path.getsize(file_path)
-            
-            return info
-            
     except PermissionError as e:
         return {
             "success": False,
@@ -173,84 +800,248 @@ def get_pdf_info(file_path: str) -> Dict[str, Any]:
             "error": f"Error getting PDF info: {str(e)}"
         }
 
+@dataclass(slots=True)
+class _PdfFileEntry:
+    """
+    扫描得到的PDF文件信息（使用__slots__，大目录下比字典省内存）
+    """
+    filename: str
+    full_path: str
+    relative_path: str
+    directory: str
+    size: Optional[int] = None
+    modified: Optional[float] = None
+    permission_error: Optional[str] = None
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为返回给调用方的字典，省略值为None的字段
+        """
+        return {
+            name: value
+            for name in _PDF_FILE_ENTRY_FIELDS
+            if (value := getattr(self, name)) is not None
+        }
+
+_PDF_FILE_ENTRY_FIELDS = tuple(f.name for f in fields(_PdfFileEntry))
+
+def _scan_directory(
+    dirpath: str,
+    search_root: str,
+    recursive: bool = True,
+    include_hidden: bool = False
+) -> Tuple[List[_PdfFileEntry], List[str]]:
+    """
+    使用os.scandir扫描单个目录（DirEntry自带文件类型，扫描过程中无需stat）
+    
+    Args:
+        dirpath: 要扫描的目录
+        search_root: 搜索的根目录，用于计算相对路径
+        recursive: 是否收集需要继续进入的子目录
+        include_hidden: 是否进入隐藏目录及SKIP_DIRS中的目录
+    
+    Returns:
+        (目录中的PDF文件列表, 需要继续扫描的子目录列表)
+    """
+    pdf_entries = []
+    subdirs = []
+    
+    # 循环内使用局部变量，避免每个条目重复查找属性
+    add_pdf_entry = pdf_entries.append
+    add_subdir = subdirs.append
+    # 扫描得到的路径都以规范化的search_root开头，直接截取即可得到相对路径
+    root_prefix_len = len(os.path.join(search_root, ''))
+    
+    with os.scandir(dirpath) as it:
+        for entry in it:
+            if entry.is_dir():
+                # 与os.walk一致，不进入符号链接指向的目录；默认同时跳过隐藏目录和依赖/版本库目录
+                if (recursive and not entry.is_symlink()
+                        and (include_hidden
+                             or (not entry.name.startswith('.') and entry.name not in SKIP_DIRS))):
+                    add_subdir(entry.path)
+                continue
+            
+            if not _is_pdf_name(entry.name):
+                continue
+            
+            # 扫描根目录已规范化为绝对路径，entry.path无需再调用abspath
+            full_path = entry.path
+            
+            # 计算相对路径（相对于搜索目录）
+            relative_path = full_path[root_prefix_len:]
+            
+            # 文件大小和修改时间留到确定要返回该条目时再批量获取
+            add_pdf_entry(_PdfFileEntry(entry.name, full_path, relative_path, dirpath))
+    
+    return pdf_entries, subdirs
+
+def _scan_subdirectory(
+    dirpath: str,
+    search_root: str,
+    include_hidden: bool = False
+) -> Tuple[List[_PdfFileEntry], List[str]]:
+    """
+    扫描子目录，无法访问的子目录直接跳过
+    """
+    try:
+        return _scan_directory(dirpath, search_root, include_hidden=include_hidden)
+    except OSError:
+        return [], []
+
+def _walk_pdfs_dfs(search_root: str, include_hidden: bool = False) -> Iterator[_PdfFileEntry]:
+    """
+    单线程深度优先递归查找PDF文件，输出顺序与os.walk一致
+    """
+    pdf_entries, subdirs = _scan_directory(search_root, search_root, include_hidden=include_hidden)
+    yield from pdf_entries
+    
+    # 先输出当前目录的文件，再依次进入子目录
+    stack = subdirs[::-1]
+    while stack:
+        pdf_entries, subdirs = _scan_subdirectory(stack.pop(), search_root, include_hidden)
+        yield from pdf_entries
+        stack.extend(reversed(subdirs))
+
+def _walk_pdfs_bfs(search_root: str, include_hidden: bool = False) -> Iterator[_PdfFileEntry]:
+    """
+    多线程广度优先递归查找PDF文件
+    
+    scandir在读取目录时会释放GIL，因此同一层的子目录交给线程池并行扫描；
+    executor.map按提交顺序返回结果，输出顺序是确定的
+    """
+    pdf_entries, level = _scan_directory(search_root, search_root, include_hidden=include_hidden)
+    yield from pdf_entries
+    
+    executor = ThreadPoolExecutor(max_workers=WALK_WORKERS)
+    try:
+        while level:
+            next_level = []
+            for pdf_entries, subdirs in executor.map(
+                _scan_subdirectory, level, repeat(search_root), repeat(include_hidden)
+            ):
+                yield from pdf_entries
+                next_level.extend(subdirs)
+            level = next_level
+    finally:
+        # 调用方提前停止迭代（如达到max_files）时取消尚未开始的扫描
+        executor.shutdown(cancel_futures=True)
+
+def _stat_pdf_entry(pdf_entry: _PdfFileEntry) -> None:
+    """
+    获取单个PDF文件的大小和修改时间
+    """
+    try:
+        st = os.stat(pdf_entry.full_path)
+        pdf_entry.size = st.st_size
+        pdf_entry.modified = st.st_mtime
+    except PermissionError as e:
+        # 如果权限不足，仍然添加文件名但标记权限错误
+        pdf_entry.permission_error = str(e)
+    except Exception as e:
+        # 如果无法获取文件信息，仍然添加文件名
+        pdf_entry.error = str(e)
+
+def _stat_pdf_entries(pdf_entries: List[_PdfFileEntry]) -> None:
+    """
+    批量获取PDF文件的大小和修改时间
+    
+    默认逐个stat；开启PARALLEL_STAT且条目较多时用线程池并发发起（stat调用会释放GIL），
+    以重叠网络文件系统上的系统调用等待时间
+    """
+    if not PARALLEL_STAT or len(pdf_entries) < STAT_BATCH_MIN_FILES:
+        for pdf_entry in pdf_entries:
+            _stat_pdf_entry(pdf_entry)
+        return
+    
+    with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+        # 消费迭代器以等待全部完成
+        for _ in executor.map(_stat_pdf_entry, pdf_entries):
+            pass
+
 @mcp.tool()
-def list_pdfs_in_directory(directory_path: str) -> Dict[str, Any]:
+def list_pdfs_in_directory(
+    directory_path: str,
+    recursive: bool = True,
+    max_files: Optional[int] = None,
+    offset: int = 0,
+    limit: int = 1000,
+    strategy: Literal["dfs", "bfs"] = "dfs",
+    include_hidden: bool = False
+) -> Dict[str, Any]:
     """
     列出指定目录下的所有PDF文件
     
     Args:
         directory_path: 目录绝对路径（必须是绝对路径）
+        recursive: 是否递归查找子目录（默认跳过隐藏目录、node_modules等，见include_hidden）
+        max_files: 最多查找的PDF文件数量，达到后立即停止扫描，为None则不限制
+        offset: 分页起始位置
+        limit: 每页返回的文件数量，配合返回值中的next_offset分页获取
+        strategy: 递归查找方式，"dfs"（默认）为单线程深度优先扫描（顺序与os.walk一致），
+            "bfs"为多线程按层并行扫描，适合目录读取延迟较高的网络文件系统
+        include_hidden: 是否也进入隐藏目录以及node_modules、__pycache__等默认跳过的目录
     
     Returns:
         包含PDF文件列表的字典
     """
     try:
-        # 验证输入必须是绝对路径
-        if not os.path.isabs(directory_path):
+        if strategy not in ("dfs", "bfs"):
             return {
                 "success": False,
-                "error": f"Directory path must be absolute path, got: {directory_path}"
+                "error": f"strategy must be 'dfs' or 'bfs', got: {strategy}"
             }
         
-        if not os.path.exists(directory_path):
+        if offset < 0 or limit <= 0:
             return {
                 "success": False,
-                "error": f"Directory not found: {directory_path}"
+                "error": f"offset must be >= 0 and limit must be > 0, got: offset={offset}, limit={limit}"
             }
         
-        if not os.path.isdir(directory_path):
+        if max_files is not None and max_files < 0:
             return {
                 "success": False,
-                "error": f"Path is not a directory: {directory_path}"
+                "error": f"max_files must be >= 0 or null, got: {max_files}"
             }
         
-        pdf_files = []
+        # 验证输入必须是绝对路径且为存在的目录
+        _, error = _validate_abs_path(directory_path, kind='directory')
+        if error is not None:
+            return error
         
-        # 递归查找PDF文件
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    full_path = os.path.abspath(os.path.join(root, file))
-                    
-                    # 计算相对路径（相对于搜索目录）
-                    relative_path = os.path.relpath(full_path, directory_path)
-                    
-                    try:
-                        file_size = os.path.getsize(full_path)
-                        modification_time = os.path.getmtime(full_path)
-                        
-                        pdf_files.append({
-                            "filename": file,
-                            "full_path": full_path,
-                            "relative_path": relative_path,
-                            "directory": os.path.abspath(root),
-                            "size": file_size,
-                            "modified": modification_time
-                        })
-                    except PermissionError as e:
-                        # 如果权限不足，仍然添加文件名但标记权限错误
-                        pdf_files.append({
-                            "filename": file,
-                            "full_path": full_path,
-                            "relative_path": relative_path,
-                            "directory": os.path.abspath(root),
-                            "permission_error": str(e)
-                        })
-                    except Exception as e:
-                        # 如果无法获取文件信息，仍然添加文件名
-                        pdf_files.append({
-                            "filename": file,
-                            "full_path": full_path,
-                            "relative_path": relative_path,
-                            "directory": os.path.abspath(root),
-                            "error": str(e)
-                        })
+        # 查找PDF文件；设置了max_files时多取一个用于判断是否还有剩余，随即停止扫描
+        # 输入已校验为绝对路径，只需规范化一次，之后扫描得到的路径都是规范的绝对路径
+        scan_root = os.path.normpath(directory_path)
+        if not recursive:
+            pdf_iter = iter(_scan_directory(scan_root, scan_root, recursive=False)[0])
+        elif strategy == "bfs":
+            pdf_iter = _walk_pdfs_bfs(scan_root, include_hidden)
+        else:
+            pdf_iter = _walk_pdfs_dfs(scan_root, include_hidden)
+        
+        if max_files is None:
+            pdf_files = list(pdf_iter)
+        else:
+            pdf_files = list(islice(pdf_iter, max_files + 1))
+        
+        truncated = max_files is not None and len(pdf_files) > max_files
+        if truncated:
+            del pdf_files[max_files:]
+        
+        # 只对当前页的条目获取文件信息并转换为字典返回
+        page_end = offset + limit
+        next_offset = page_end if page_end < len(pdf_files) else None
+        page_entries = pdf_files[offset:page_end]
+        _stat_pdf_entries(page_entries)
         
         return {
             "success": True,
             "search_directory": directory_path,
             "pdf_count": len(pdf_files),
-            "pdf_files": pdf_files
+            "pdf_files": [pdf_entry.to_dict() for pdf_entry in page_entries],
+            "truncated": truncated,
+            "next_offset": next_offset
         }
         
     except PermissionError as e:
@@ -264,6 +1055,17 @@ def list_pdfs_in_directory(directory_path: str) -> Dict[str, Any]:
             "error": f"Error listing PDFs: {str(e)}"
         }
 
+@mcp.tool()
+def clear_pdf_cache() -> Dict[str, Any]:
+    """
+    清空已解析PDF的缓存并关闭相关文件句柄
+    
+    Returns:
+        操作结果字典
+    """
+    _pdf_cache_clear()
+    return {"success": True}
+
 def main():
     mcp.run()
 